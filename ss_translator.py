@@ -5,15 +5,30 @@ import os
 import ctypes
 import json
 import re
+import time
+import hashlib
+import sqlite3
+import argparse
+import multiprocessing
+import urllib.request
+import csv
+import itertools
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PyQt6.QtWidgets import (QApplication, QWidget, QLabel, QScrollArea, QVBoxLayout, 
                              QHBoxLayout, QLineEdit, QPushButton, QComboBox, QMessageBox,
-                             QTabWidget, QListWidget, QListWidgetItem)
-from PyQt6.QtCore import Qt, QRect, QPoint, QObject, pyqtSignal, QSize, QTimer
+                             QTabWidget, QListView, QStyledItemDelegate, QStyle, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog)
+from PyQt6.QtCore import (Qt, QRect, QPoint, QObject, pyqtSignal, QSize, QTimer, QRunnable, QThreadPool,
+                          QAbstractListModel, QModelIndex)
 from PyQt6.QtGui import (QPainter, QColor, QPen, QGuiApplication, QFont, 
-                         QIcon, QAction, QIntValidator, QPixmap)
-from pynput import keyboard
+                         QIcon, QAction, QIntValidator, QPixmap, QImage, QFontMetrics)
 from PIL import Image
+import numpy as np
 import pytesseract
+try: import tesserocr
+except ImportError: tesserocr = None
 
 def resource_path(relative_path):
     try:
@@ -27,13 +42,21 @@ if os.path.exists(tesseract_path):
     pytesseract.pytesseract.tesseract_cmd = tesseract_path
 else:
     print(f"ERROR: Tesseract.exe not found at expected path: {tesseract_path}")
+tessdata_path = resource_path(os.path.join("Tesseract-OCR", "tessdata"))
 
 CONFIG_FILE = 'config.json'
 HISTORY_FILE = 'history.json'
-MAX_HISTORY_ENTRIES = 50
+HISTORY_DB_FILE = 'history.db'
+HISTORY_PAGE_SIZE = 200
 # Width ve Height ayarları kaldırıldı
 DEFAULT_CONFIG = {
-    'api_key': '', 'source_lang': 'Auto', 'target_lang': 'TR'
+    'api_key': '', 'source_lang': 'Auto', 'target_lang': 'TR', 'ocr_cache_max_distance': 3, 'ocr_cache_max_changed_pixels': 0,
+    'ocr_engine': 'auto',
+    'preprocess_threshold': True, 'preprocess_threshold_window': 31, 'preprocess_threshold_offset': 10,
+    'preprocess_crop': True, 'preprocess_upscale': True, 'preprocess_target_dpi': 192,
+    'layout_parallel_ocr': True, 'layout_min_pixels': 300_000, 'layout_ocr_workers': 0,
+    'translator_backend': 'deepl', 'translator_server_url': '',
+    'watch_mode': False, 'watch_fps': 4, 'watch_max_interval_ms': 2000, 'watch_tile_size': 32
 }
 SUPPORTED_LANGUAGES = {
     "Auto-Detect": {"deepl": "Auto", "tess": "eng"},
@@ -46,6 +69,28 @@ SUPPORTED_LANGUAGES = {
     "Japanese":    {"deepl": "JA", "tess": "jpn"},
     "Russian":     {"deepl": "RU", "tess": "rus"}
 }
+MAX_CONCURRENT_JOBS = 2
+TRANSLATION_CACHE_FILE = 'translation_cache.db'
+TRANSLATION_CACHE_MEMORY_ENTRIES = 256
+TRANSLATION_CACHE_DISK_ENTRIES = 20000
+TRANSLATION_CACHE_MAX_AGE_DAYS = 90
+OCR_CACHE_ENTRIES = 128
+OCR_HASH_SIZE = 16
+OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+OCR_CACHE_PIXEL_DELTA = 24
+SCREEN_BASE_DPI = 96
+PREPROCESS_MAX_PIXELS = 16_000_000
+PREPROCESS_CROP_MARGIN = 8
+WATCH_PIXEL_DELTA = 24
+DEEPL_MAX_TEXTS_PER_REQUEST = 50
+DEEPL_MAX_REQUEST_BYTES = 120 * 1024
+LATENCY_WINDOW = 1000
+LATENCY_STAGES = ('grab', 'convert', 'ocr_cache', 'preprocess', 'preprocess.threshold', 'preprocess.crop', 'preprocess.upscale', 'ocr', 'normalize', 'translate',
+                  'segment', 'blocks', 'block.ocr', 'block.translate', 'first_block', 'overlay', 'total', 'watch.grab', 'watch.frame')
+BATCH_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+WATCH_LINE_CACHE_ENTRIES = 512
+WATCHING_TEXT = "Watching region…"
+TRANSLATING_TEXT = "Translating…"
 
 def load_json(file_path, default_data):
     if not os.path.exists(file_path): return default_data
@@ -59,25 +104,410 @@ def save_json(file_path, data):
         json.dump(data, f, indent=4, ensure_ascii=False)
 
 app_config = load_json(CONFIG_FILE, DEFAULT_CONFIG)
-translation_history = load_json(HISTORY_FILE, [])
-
-def add_to_history(source_text, translated_text):
-    global translation_history;
-    new_entry = {'source': source_text, 'target': translated_text}
-    if translation_history and translation_history[0] == new_entry: return
-    translation_history.insert(0, new_entry); translation_history = translation_history[:MAX_HISTORY_ENTRIES]
-    save_json(HISTORY_FILE, translation_history)
-    if communicator: communicator.history_updated.emit()
-
-class HistoryItemWidget(QWidget):
-    def __init__(self, source_text, target_text):
-        super().__init__(); self.source = source_text; self.target = target_text
-        layout = QVBoxLayout(self); layout.setContentsMargins(5, 5, 5, 5); layout.setSpacing(2)
-        display_target = self.target.replace('\n', ' ').strip()
-        source_preview = (self.source.replace('\n', ' ').strip()[:70] + '...') if len(self.source) > 70 else self.source.replace('\n', ' ').strip()
-        self.target_label = QLabel(display_target); self.target_label.setFont(QFont("Arial", 11)); self.target_label.setStyleSheet("color: white;"); self.target_label.setWordWrap(True)
-        self.source_label = QLabel(source_preview); self.source_label.setFont(QFont("Arial", 9)); self.source_label.setStyleSheet("color: #aaa;"); self.source_label.setWordWrap(True)
-        layout.addWidget(self.target_label); layout.addWidget(self.source_label)
+
+class LatencyStats:
+    # Rolling window of the last LATENCY_WINDOW samples per stage; percentiles are computed on read, recording stays O(1)
+    def __init__(self, window=LATENCY_WINDOW): self.lock = threading.Lock(); self.window = window; self.samples = {}; self.counts = {}
+    @contextmanager
+    def span(self, stage, trace=None):
+        stage_start = time.perf_counter()
+        try: yield
+        finally: self.record(stage, (time.perf_counter() - stage_start) * 1000, trace)
+    def record(self, stage, elapsed_ms, trace=None):
+        with self.lock:
+            if stage not in self.samples: self.samples[stage] = deque(maxlen=self.window); self.counts[stage] = 0
+            self.samples[stage].append(elapsed_ms); self.counts[stage] += 1
+        if trace is not None: trace[stage] = trace.get(stage, 0.0) + elapsed_ms
+    @staticmethod
+    def percentile(sorted_values, percent): return sorted_values[min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))]
+    def summary(self):
+        with self.lock: snapshot = {stage: (sorted(values), self.counts[stage]) for stage, values in self.samples.items() if values}
+        order = {stage: position for position, stage in enumerate(LATENCY_STAGES)}; rows = []
+        for stage in sorted(snapshot, key=lambda name: (order.get(name, len(order)), name)):
+            values, count = snapshot[stage]
+            rows.append({'stage': stage, 'count': count, 'p50': self.percentile(values, 50), 'p95': self.percentile(values, 95), 'p99': self.percentile(values, 99), 'max': values[-1]})
+        return rows
+    def reset(self):
+        with self.lock: self.samples.clear(); self.counts.clear()
+    def export(self, file_path, extra=None):
+        rows = self.summary()
+        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            if file_path.lower().endswith('.csv'):
+                writer = csv.DictWriter(f, fieldnames=['stage', 'count', 'p50', 'p95', 'p99', 'max']); writer.writeheader(); writer.writerows(rows)
+            else: json.dump({'exported': time.time(), 'window': self.window, 'stages': rows, **(extra or {})}, f, indent=4, ensure_ascii=False)
+
+def format_trace(trace): return ", ".join(f"{stage} {elapsed_ms:.1f}" for stage, elapsed_ms in trace.items())
+
+latency_stats = LatencyStats()
+
+class TranslationCache:
+    def __init__(self, file_path, memory_entries=TRANSLATION_CACHE_MEMORY_ENTRIES, disk_entries=TRANSLATION_CACHE_DISK_ENTRIES, max_age_days=TRANSLATION_CACHE_MAX_AGE_DAYS):
+        self.lock = threading.Lock(); self.memory = OrderedDict(); self.memory_entries = memory_entries
+        self.disk_entries = disk_entries; self.max_age = max_age_days * 86400; self.writes = 0
+        self.hits = 0; self.disk_hits = 0; self.misses = 0
+        try:
+            self.db = sqlite3.connect(file_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translated TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed)")
+            with self.lock: self.evict_expired()
+        except sqlite3.Error as e: print(f"Translation cache is memory-only, could not open {file_path}: {e}"); self.db = None
+    @staticmethod
+    def make_key(text, source_lang, target_lang):
+        # Only spaces and tabs are collapsed: line and paragraph breaks are part of the text that gets translated
+        normalized_text = '\n'.join(re.sub(r'[ \t]+', ' ', line).strip() for line in text.strip().split('\n'))
+        return hashlib.sha1(f"{source_lang or 'Auto'}\x00{target_lang}\x00{normalized_text}".encode('utf-8')).hexdigest()
+    def remember(self, key, translated_text):
+        self.memory[key] = translated_text; self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries: self.memory.popitem(last=False)
+    def get(self, text, source_lang, target_lang):
+        key = self.make_key(text, source_lang, target_lang)
+        with self.lock:
+            if key in self.memory: self.memory.move_to_end(key); self.hits += 1; return self.memory[key]
+            if self.db is not None:
+                try:
+                    now = time.time(); row = self.db.execute("SELECT translated, created FROM translations WHERE key = ?", (key,)).fetchone()
+                    if row and now - row[1] <= self.max_age:
+                        self.db.execute("UPDATE translations SET accessed = ? WHERE key = ?", (now, key)); self.db.commit()
+                        self.remember(key, row[0]); self.hits += 1; self.disk_hits += 1; return row[0]
+                except sqlite3.Error as e: print(f"Translation cache read failed: {e}")
+            self.misses += 1; return None
+    def put(self, text, source_lang, target_lang, translated_text):
+        key = self.make_key(text, source_lang, target_lang)
+        with self.lock:
+            self.remember(key, translated_text)
+            if self.db is None: return
+            try:
+                now = time.time(); self.db.execute("INSERT OR REPLACE INTO translations (key, translated, created, accessed) VALUES (?, ?, ?, ?)", (key, translated_text, now, now))
+                self.writes += 1
+                if self.writes % 100 == 0: self.evict_expired()
+                self.db.commit()
+            except sqlite3.Error as e: print(f"Translation cache write failed: {e}")
+    def evict_expired(self):
+        self.db.execute("DELETE FROM translations WHERE created < ?", (time.time() - self.max_age,))
+        self.db.execute("DELETE FROM translations WHERE key NOT IN (SELECT key FROM translations ORDER BY accessed DESC LIMIT ?)", (self.disk_entries,))
+        self.db.commit()
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None: self.db.execute("DELETE FROM translations"); self.db.commit()
+    def stats(self):
+        with self.lock: return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'memory_entries': len(self.memory)}
+
+class OcrCache:
+    # The dHash only narrows down candidates; a changed digit or letter barely moves a 16x16 thumbnail, so a hit is
+    # confirmed by comparing the full-resolution grayscale frames pixel by pixel
+    def __init__(self, max_entries=OCR_CACHE_ENTRIES, hash_size=OCR_HASH_SIZE, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.lock = threading.Lock(); self.entries = OrderedDict(); self.max_entries = max_entries; self.hash_size = hash_size; self.max_bytes = max_bytes
+        self.stored_bytes = 0; self.next_key = 0; self.saved_calls = 0; self.misses = 0
+    def image_hash(self, gray):
+        # Difference hash: one bit per horizontally adjacent pair of a (hash_size + 1) x hash_size thumbnail
+        thumbnail = np.asarray(Image.fromarray(gray).resize((self.hash_size + 1, self.hash_size), Image.Resampling.BILINEAR), dtype=np.int16)
+        return int.from_bytes(np.packbits(thumbnail[:, :-1] > thumbnail[:, 1:]).tobytes(), 'big')
+    @staticmethod
+    def same_content(gray_a, gray_b, max_changed_pixels):
+        return np.count_nonzero(np.abs(gray_a.astype(np.int16) - gray_b) > OCR_CACHE_PIXEL_DELTA) <= max_changed_pixels
+    def lookup(self, gray, lang, max_distance, max_changed_pixels=0):
+        image_hash = self.image_hash(gray)
+        with self.lock:
+            if max_distance >= 0:
+                for key, (entry_lang, entry_hash, entry_gray, text) in reversed(self.entries.items()):
+                    if entry_lang != lang or entry_gray.shape != gray.shape or bin(entry_hash ^ image_hash).count('1') > max_distance: continue
+                    if self.same_content(gray, entry_gray, max_changed_pixels): self.entries.move_to_end(key); self.saved_calls += 1; return image_hash, text
+            self.misses += 1; return image_hash, None
+    def store(self, image_hash, gray, lang, text):
+        if gray.nbytes > self.max_bytes: return
+        with self.lock:
+            self.next_key += 1; self.entries[self.next_key] = (lang, image_hash, gray, text); self.stored_bytes += gray.nbytes
+            while len(self.entries) > self.max_entries or self.stored_bytes > self.max_bytes: self.stored_bytes -= self.entries.popitem(last=False)[1][2].nbytes
+    def clear(self):
+        with self.lock: self.entries.clear(); self.stored_bytes = 0
+    def stats(self):
+        with self.lock: return {'saved_calls': self.saved_calls, 'misses': self.misses, 'entries': len(self.entries), 'bytes': self.stored_bytes}
+
+class PytesseractOcrEngine:
+    name = 'pytesseract'
+    def warm_up(self, lang): pass
+    def recognize(self, image, lang): return pytesseract.image_to_string(image, lang=lang).strip()
+    def close(self): pass
+
+class StubOcrEngine:
+    # With unique_texts each call gets its own numbered text, so the text blocks of one page do not turn into
+    # translation cache hits after the first and every block pays the simulated translation round-trip
+    name = 'stub'
+    def __init__(self, delay_ms=0, unique_texts=False): self.delay_ms = delay_ms; self.next_text = ''; self.unique_texts = unique_texts; self.calls = itertools.count(1)
+    def warm_up(self, lang): pass
+    def recognize(self, image, lang):
+        if self.delay_ms: time.sleep(self.delay_ms / 1000)
+        return f"{self.next_text} #{next(self.calls)}" if self.unique_texts and self.next_text else self.next_text
+    def close(self): pass
+
+def get_layout_worker_count(): return app_config.get('layout_ocr_workers') or os.cpu_count() or 1
+
+class TesserocrOcrEngine:
+    # Keeps initialized TessBaseAPIs per language so traineddata is loaded once instead of per capture.
+    # Each API serves one recognition at a time; the block pool never runs more than its worker count at once,
+    # so max_instances defaults to that and no API is loaded that could only sit idle.
+    name = 'tesserocr'
+    def __init__(self, data_path=None, max_instances=None):
+        self.data_path = data_path; self.max_instances = max_instances or get_layout_worker_count()
+        self.idle_apis = {}; self.api_counts = {}; self.failed_langs = set(); self.condition = threading.Condition(); self.fallback = PytesseractOcrEngine()
+    def create_api(self, lang):
+        api_kwargs = {'lang': lang}
+        if self.data_path: api_kwargs['path'] = os.path.join(self.data_path, '')
+        return tesserocr.PyTessBaseAPI(**api_kwargs)
+    def acquire(self, lang):
+        with self.condition:
+            while True:
+                if lang in self.failed_langs: return None
+                if self.idle_apis.get(lang): return self.idle_apis[lang].pop()
+                if self.api_counts.get(lang, 0) < self.max_instances: self.api_counts[lang] = self.api_counts.get(lang, 0) + 1; break
+                self.condition.wait()
+        try: api = self.create_api(lang); print(f"Tesseract engine loaded for '{lang}' ({self.api_counts[lang]} instance(s))."); return api
+        except RuntimeError as e:
+            print(f"Could not load Tesseract engine for '{lang}', falling back to pytesseract: {e}")
+            with self.condition: self.api_counts[lang] -= 1; self.failed_langs.add(lang); self.condition.notify_all()
+            return None
+    def release(self, lang, api):
+        with self.condition: self.idle_apis.setdefault(lang, []).append(api); self.condition.notify()
+    def warm_up(self, lang):
+        api = self.acquire(lang)
+        if api is not None: self.release(lang, api)
+    def recognize(self, image, lang):
+        api = self.acquire(lang)
+        if api is None: return self.fallback.recognize(image, lang)
+        try: api.SetImage(image); return api.GetUTF8Text().strip()
+        finally: self.release(lang, api)
+    def close(self):
+        with self.condition:
+            for apis in self.idle_apis.values():
+                for api in apis: api.End()
+            self.idle_apis.clear(); self.api_counts.clear()
+
+def create_ocr_engine(engine_name):
+    if engine_name in ('auto', 'tesserocr') and tesserocr is not None: return TesserocrOcrEngine(tessdata_path if os.path.isdir(tessdata_path) else None)
+    if engine_name == 'tesserocr': print("tesserocr is not installed, using pytesseract.")
+    return PytesseractOcrEngine()
+
+translation_cache = None; translation_cache_lock = threading.Lock(); ocr_cache = OcrCache()
+ocr_engine = None; ocr_engine_lock = threading.Lock()
+
+def get_translation_cache():
+    global translation_cache
+    with translation_cache_lock:
+        if translation_cache is None: translation_cache = TranslationCache(TRANSLATION_CACHE_FILE)
+        return translation_cache
+
+def get_ocr_engine():
+    global ocr_engine
+    with ocr_engine_lock:
+        if ocr_engine is None: ocr_engine = create_ocr_engine(app_config.get('ocr_engine', DEFAULT_CONFIG['ocr_engine'])); print(f"OCR engine: {ocr_engine.name}")
+        return ocr_engine
+
+def warm_up_ocr_engine(source_lang):
+    threading.Thread(target=lambda: get_ocr_engine().warm_up(get_ocr_lang_code(source_lang)), daemon=True).start()
+class DeepLBackend:
+    name = 'deepl'
+    def __init__(self, api_key, server_url=None): self.translator = deepl.Translator(api_key, server_url=server_url or None)
+    def translate_batch(self, texts, source_lang, target_lang):
+        translate_kwargs = {'target_lang': target_lang}
+        if source_lang and source_lang != 'Auto': translate_kwargs['source_lang'] = source_lang
+        return [result.text for result in self.translator.translate_text(texts, **translate_kwargs)]
+    def close(self):
+        if hasattr(self.translator, 'close'): self.translator.close()
+
+class HttpJsonBackend:
+    # Minimal JSON contract for offline runs against a local fake server:
+    # POST {"texts": [...], "source_lang": ..., "target_lang": ...} -> {"translations": [...]}
+    name = 'http'
+    def __init__(self, api_key, server_url=None):
+        if not server_url: raise ValueError("The http translator backend needs a server URL.")
+        self.api_key = api_key; self.server_url = server_url
+    def translate_batch(self, texts, source_lang, target_lang):
+        payload = json.dumps({'texts': texts, 'source_lang': None if source_lang == 'Auto' else source_lang, 'target_lang': target_lang}).encode('utf-8')
+        request = urllib.request.Request(self.server_url, data=payload, headers={'Content-Type': 'application/json', 'Authorization': f"Bearer {self.api_key}"})
+        with urllib.request.urlopen(request, timeout=30) as response: translations = json.load(response)['translations']
+        if len(translations) != len(texts): raise ValueError(f"Translation server returned {len(translations)} results for {len(texts)} texts.")
+        return translations
+    def close(self): pass
+
+class EchoBackend:
+    # Offline stand-in that tags the text instead of translating it; used by the benchmark and for dry runs
+    name = 'echo'
+    def __init__(self, api_key='', server_url=None): self.delay_ms = 0
+    def translate_batch(self, texts, source_lang, target_lang):
+        if self.delay_ms: time.sleep(self.delay_ms / 1000)
+        return [f"[{target_lang}] {text}" for text in texts]
+    def close(self): pass
+
+TRANSLATOR_BACKENDS = {'deepl': DeepLBackend, 'http': HttpJsonBackend, 'echo': EchoBackend}
+
+def create_translator_backend(backend_name, api_key, server_url=None):
+    if backend_name not in TRANSLATOR_BACKENDS: raise ValueError(f"Unknown translator backend: {backend_name}")
+    return TRANSLATOR_BACKENDS[backend_name](api_key, server_url or None)
+
+shared_translator = None; shared_translator_key = None; translator_lock = threading.Lock()
+
+def replace_translator(api_key):
+    # Caller holds translator_lock. The old client is not closed: a capture job may still be in a request on it,
+    # and its connections are released once the last job using it drops the reference
+    global shared_translator, shared_translator_key
+    shared_translator = create_translator_backend(app_config.get('translator_backend', DEFAULT_CONFIG['translator_backend']), api_key, app_config.get('translator_server_url')) if api_key else None
+    shared_translator_key = api_key; return shared_translator
+
+def reset_translator(api_key):
+    with translator_lock: replace_translator(api_key)
+
+def get_translator(api_key):
+    with translator_lock:
+        if shared_translator is not None and shared_translator_key == api_key: return shared_translator
+        return replace_translator(api_key)
+
+def chunk_texts(texts, max_texts=None, max_bytes=None):
+    max_texts = max_texts or DEEPL_MAX_TEXTS_PER_REQUEST; max_bytes = max_bytes or DEEPL_MAX_REQUEST_BYTES; chunk = []; chunk_bytes = 0
+    for text in texts:
+        text_bytes = len(text.encode('utf-8'))
+        if chunk and (len(chunk) >= max_texts or chunk_bytes + text_bytes > max_bytes): yield chunk; chunk = []; chunk_bytes = 0
+        chunk.append(text); chunk_bytes += text_bytes
+    if chunk: yield chunk
+
+def translate_texts_cached(texts, backend, source_lang, target_lang):
+    translation_cache = get_translation_cache(); translations = {'': ''}; missing_texts = []
+    for text in texts:
+        if text in translations: continue
+        cached_text = translation_cache.get(text, source_lang, target_lang)
+        if cached_text is None: missing_texts.append(text); translations[text] = None
+        else: translations[text] = cached_text
+    if not missing_texts and any(texts): print(f"Translation cache hit: {translation_cache.stats()}")
+    for chunk in chunk_texts(missing_texts):
+        for text, translated_text in zip(chunk, backend.translate_batch(chunk, source_lang, target_lang)):
+            translations[text] = translated_text; translation_cache.put(text, source_lang, target_lang, translated_text)
+    return [translations[text] for text in texts]
+
+def translate_text_cached(text, api_key, source_lang, target_lang): return translate_texts_cached([text], get_translator(api_key), source_lang, target_lang)[0]
+
+class HistoryStore:
+    # Append-only SQLite store: rowid order is newest-last, so inserts never touch existing rows
+    COLUMNS = "id, created, source, target, source_lang, target_lang"
+    def __init__(self, file_path):
+        self.lock = threading.Lock(); self.db = sqlite3.connect(file_path, check_same_thread=False); self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL"); self.db.execute("PRAGMA synchronous=NORMAL"); self.create_schema()
+    def create_schema(self):
+        self.db.execute("CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, source TEXT NOT NULL, target TEXT NOT NULL, source_lang TEXT, target_lang TEXT, digest TEXT NOT NULL UNIQUE)")
+        try:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(source, target, content='history', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+            self.db.execute("CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN INSERT INTO history_fts (rowid, source, target) VALUES (new.id, new.source, new.target); END")
+            self.db.execute("CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN INSERT INTO history_fts (history_fts, rowid, source, target) VALUES ('delete', old.id, old.source, old.target); END")
+            self.has_fts = True
+        except sqlite3.OperationalError as e: print(f"SQLite FTS5 is unavailable, history search falls back to LIKE: {e}"); self.has_fts = False
+        self.db.commit()
+    @staticmethod
+    def make_digest(source_text, translated_text, source_lang, target_lang):
+        return hashlib.sha1(f"{source_lang}\x00{target_lang}\x00{source_text}\x00{translated_text}".encode('utf-8')).hexdigest()
+    def add(self, source_text, translated_text, source_lang=None, target_lang=None, created=None):
+        digest = self.make_digest(source_text, translated_text, source_lang, target_lang); created = created or time.time()
+        with self.lock, self.db:
+            existing = self.db.execute("SELECT id FROM history WHERE digest = ?", (digest,)).fetchone()
+            if existing:
+                if existing['id'] == self.db.execute("SELECT MAX(id) FROM history").fetchone()[0]: return None
+                # Repeats move to the top: drop the old row and append a fresh one
+                self.db.execute("DELETE FROM history WHERE id = ?", (existing['id'],))
+            cursor = self.db.execute("INSERT INTO history (created, source, target, source_lang, target_lang, digest) VALUES (?, ?, ?, ?, ?, ?)", (created, source_text, translated_text, source_lang, target_lang, digest))
+            return {'id': cursor.lastrowid, 'created': created, 'source': source_text, 'target': translated_text, 'source_lang': source_lang, 'target_lang': target_lang, 'replaced_id': existing['id'] if existing else None}
+    def recent(self, limit, before_id=None):
+        with self.lock:
+            rows = self.db.execute(f"SELECT {self.COLUMNS} FROM history WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id or sys.maxsize, limit)).fetchall()
+        return [dict(row) for row in rows]
+    def search(self, query, limit, before_id=None):
+        terms = re.findall(r'\w+', query)
+        if not terms: return self.recent(limit, before_id)
+        with self.lock:
+            if self.has_fts:
+                fts_query = ' '.join(f'"{term}"*' for term in terms)
+                rows = self.db.execute(f"SELECT {self.COLUMNS} FROM history WHERE id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ? AND rowid < ? ORDER BY rowid DESC LIMIT ?) ORDER BY id DESC", (fts_query, before_id or sys.maxsize, limit)).fetchall()
+            else:
+                pattern = f"%{query.strip()}%"
+                rows = self.db.execute(f"SELECT {self.COLUMNS} FROM history WHERE (source LIKE ? OR target LIKE ?) AND id < ? ORDER BY id DESC LIMIT ?", (pattern, pattern, before_id or sys.maxsize, limit)).fetchall()
+        return [dict(row) for row in rows]
+    def count(self):
+        with self.lock: return self.db.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    def clear(self):
+        with self.lock:
+            self.db.execute("DROP TABLE IF EXISTS history_fts"); self.db.execute("DROP TABLE IF EXISTS history"); self.db.commit(); self.create_schema()
+    def migrate_json(self, file_path):
+        if not os.path.exists(file_path): return
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f: entries = json.load(f)
+            created = os.path.getmtime(file_path)
+            # history.json is newest-first; insert oldest-first so ids keep the same order
+            for entry in reversed(entries if isinstance(entries, list) else []): self.add(entry['source'], entry['target'], created=created)
+            os.replace(file_path, file_path + '.migrated'); print(f"Migrated {len(entries)} history entries from {file_path}.")
+        except Exception as e: print(f"Could not migrate {file_path}: {e}")
+
+history_store = None; history_store_lock = threading.Lock()
+
+def get_history_store():
+    # Opened on first use so headless subcommands never create history.db or run the history.json migration
+    global history_store
+    with history_store_lock:
+        if history_store is None: history_store = HistoryStore(HISTORY_DB_FILE); history_store.migrate_json(HISTORY_FILE)
+        return history_store
+
+def add_to_history(source_text, translated_text, source_lang=None, target_lang=None):
+    entry = get_history_store().add(source_text, translated_text, source_lang, target_lang)
+    if entry and communicator: communicator.history_updated.emit(entry)
+
+class HistoryListModel(QAbstractListModel):
+    # Pages rows in from the store on demand; the view only ever asks for the rows it is about to show
+    def __init__(self, store, parent=None):
+        super().__init__(parent); self.store = store; self.entries = []; self.query = ''; self.exhausted = False
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.entries)
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries): return None
+        entry = self.entries[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.UserRole): return entry['target']
+        if role == Qt.ItemDataRole.ToolTipRole: return entry['source']
+        return None
+    def entry(self, row): return self.entries[row]
+    def canFetchMore(self, parent=QModelIndex()): return not parent.isValid() and not self.exhausted
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted: return
+        before_id = self.entries[-1]['id'] if self.entries else None
+        page = self.store.search(self.query, HISTORY_PAGE_SIZE, before_id) if self.query else self.store.recent(HISTORY_PAGE_SIZE, before_id)
+        if len(page) < HISTORY_PAGE_SIZE: self.exhausted = True
+        if not page: return
+        self.beginInsertRows(QModelIndex(), len(self.entries), len(self.entries) + len(page) - 1); self.entries.extend(page); self.endInsertRows()
+    def set_query(self, query):
+        self.beginResetModel(); self.query = query; self.entries = []; self.exhausted = False; self.endResetModel(); self.fetchMore()
+    def matches_query(self, entry):
+        words = set(re.findall(r'\w+', f"{entry['source']} {entry['target']}".lower()))
+        return all(any(word.startswith(term) for word in words) for term in re.findall(r'\w+', self.query.lower()))
+    def add_entry(self, entry):
+        replaced_row = next((row for row, existing in enumerate(self.entries) if existing['id'] == entry.get('replaced_id')), None) if entry.get('replaced_id') else None
+        if replaced_row is not None: self.beginRemoveRows(QModelIndex(), replaced_row, replaced_row); del self.entries[replaced_row]; self.endRemoveRows()
+        if self.query and not self.matches_query(entry): return
+        self.beginInsertRows(QModelIndex(), 0, 0); self.entries.insert(0, entry); self.endInsertRows()
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    PADDING = 8
+    def __init__(self, parent=None):
+        super().__init__(parent); self.target_font = QFont("Arial", 11); self.source_font = QFont("Arial", 9)
+        self.target_metrics = QFontMetrics(self.target_font); self.source_metrics = QFontMetrics(self.source_font)
+    def sizeHint(self, option, index):
+        # Fixed row height (two target lines + one source line) lets the view use uniform item sizes
+        return QSize(self.parent().viewport().width(), self.target_metrics.lineSpacing() * 2 + self.source_metrics.lineSpacing() + self.PADDING * 2 + 2)
+    def paint(self, painter, option, index):
+        painter.save(); rect = option.rect
+        if option.state & QStyle.StateFlag.State_Selected: painter.fillRect(rect, QColor("#0078d7"))
+        elif option.state & QStyle.StateFlag.State_MouseOver: painter.fillRect(rect, QColor("#3399ff"))
+        painter.setPen(QColor("#444")); painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        text_rect = rect.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING); source_text = (index.data(Qt.ItemDataRole.ToolTipRole) or '').replace('\n', ' ').strip()
+        target_text = self.target_metrics.elidedText((index.data(Qt.ItemDataRole.DisplayRole) or '').replace('\n', ' ').strip(), Qt.TextElideMode.ElideRight, text_rect.width() * 2 - self.target_metrics.averageCharWidth() * 4)
+        target_rect = QRect(text_rect.left(), text_rect.top(), text_rect.width(), self.target_metrics.lineSpacing() * 2)
+        painter.setFont(self.target_font); painter.setPen(QColor("white")); painter.drawText(target_rect, int(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop | Qt.TextFlag.TextWordWrap), target_text)
+        source_preview = (source_text[:70] + '...') if len(source_text) > 70 else source_text
+        source_rect = QRect(text_rect.left(), target_rect.bottom() + 1, text_rect.width(), self.source_metrics.lineSpacing())
+        painter.setFont(self.source_font); painter.setPen(QColor("#aaa")); painter.drawText(source_rect, int(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop), self.source_metrics.elidedText(source_preview, Qt.TextElideMode.ElideRight, text_rect.width()))
+        painter.restore()
 
 class SettingsWindow(QWidget):
     def __init__(self, icon_path):
@@ -89,6 +519,7 @@ class SettingsWindow(QWidget):
     def save_api_key(self):
         global app_config; api_key = self.api_key_input.text().strip()
         if not api_key: self.status_label.setText("API Key cannot be empty."); return
+        if api_key != app_config.get('api_key'): reset_translator(api_key)
         app_config['api_key'] = api_key; save_json(CONFIG_FILE, app_config); self.status_label.setText("API Key saved successfully!"); print("API Key has been updated and saved."); QTimer.singleShot(1500, self.close)
 
 class MainWindow(QWidget):
@@ -98,7 +529,8 @@ class MainWindow(QWidget):
         main_layout = QVBoxLayout(self); tabs = QTabWidget(); main_layout.addWidget(tabs)
         settings_tab = QWidget(); tabs.addTab(settings_tab, "Settings"); self.setup_settings_tab(settings_tab)
         history_tab = QWidget(); tabs.addTab(history_tab, "History"); self.setup_history_tab(history_tab)
-        if communicator: communicator.history_updated.connect(self.populate_history_list)
+        stats_tab = QWidget(); tabs.addTab(stats_tab, "Stats"); self.setup_stats_tab(stats_tab)
+        if communicator: communicator.history_updated.connect(self.history_model.add_entry)
     def setup_settings_tab(self, tab):
         settings_layout = QVBoxLayout(tab)
         lang_group_label = QLabel("Language Settings"); lang_group_label.setFont(QFont("Arial", 10, QFont.Weight.Bold)); settings_layout.addWidget(lang_group_label)
@@ -109,31 +541,52 @@ class MainWindow(QWidget):
         target_langs = {k: v for k, v in SUPPORTED_LANGUAGES.items() if k != "Auto-Detect"}; self.target_lang_combo.addItems(target_langs.keys())
         current_target_lang_code = app_config.get('target_lang', DEFAULT_CONFIG['target_lang']); current_target_lang_name = next((name for name, val in SUPPORTED_LANGUAGES.items() if val['deepl'] == current_target_lang_code), "Turkish"); self.target_lang_combo.setCurrentText(current_target_lang_name)
         target_lang_layout.addWidget(target_lang_label); target_lang_layout.addWidget(self.target_lang_combo); settings_layout.addLayout(target_lang_layout)
+        self.watch_mode_checkbox = QCheckBox("Live watch mode (F8 pins a region and keeps it translated)"); self.watch_mode_checkbox.setChecked(app_config.get('watch_mode', DEFAULT_CONFIG['watch_mode'])); settings_layout.addWidget(self.watch_mode_checkbox)
         settings_layout.addStretch()
-        button_layout = QHBoxLayout(); self.api_settings_button = QPushButton("API Key Settings"); self.api_settings_button.clicked.connect(self.open_settings_window); self.save_button = QPushButton("Save Language"); self.save_button.clicked.connect(self.save_settings_handler)
+        button_layout = QHBoxLayout(); self.api_settings_button = QPushButton("API Key Settings"); self.api_settings_button.clicked.connect(self.open_settings_window); self.save_button = QPushButton("Save Settings"); self.save_button.clicked.connect(self.save_settings_handler)
         button_layout.addWidget(self.api_settings_button); button_layout.addWidget(self.save_button); settings_layout.addLayout(button_layout)
         self.status_label = QLabel("Press F8 to translate."); self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter); settings_layout.addWidget(self.status_label)
     def setup_history_tab(self, tab):
-        history_layout = QVBoxLayout(tab); self.history_list_widget = QListWidget(); self.history_list_widget.itemDoubleClicked.connect(self.history_item_clicked)
-        self.history_list_widget.setStyleSheet("QListWidget {border: 1px solid #555;} QListWidget::item {padding: 8px; border-bottom: 1px solid #444;} QListWidget::item:hover {background-color: #3399ff;} QListWidget::item:selected {background-color: #0078d7;}")
-        self.history_list_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff); history_layout.addWidget(self.history_list_widget)
+        history_layout = QVBoxLayout(tab)
+        self.history_search_input = QLineEdit(); self.history_search_input.setPlaceholderText("Search history..."); self.history_search_input.setClearButtonEnabled(True); history_layout.addWidget(self.history_search_input)
+        self.history_search_timer = QTimer(self); self.history_search_timer.setSingleShot(True); self.history_search_timer.setInterval(150); self.history_search_timer.timeout.connect(self.populate_history_list)
+        self.history_search_input.textChanged.connect(self.history_search_timer.start)
+        self.history_model = HistoryListModel(get_history_store(), self); self.history_list_view = QListView(); self.history_list_view.setModel(self.history_model)
+        self.history_list_view.setItemDelegate(HistoryItemDelegate(self.history_list_view)); self.history_list_view.setUniformItemSizes(True); self.history_list_view.setResizeMode(QListView.ResizeMode.Adjust); self.history_list_view.setMouseTracking(True)
+        self.history_list_view.doubleClicked.connect(self.history_item_clicked); self.history_list_view.setStyleSheet("QListView {border: 1px solid #555;}")
+        self.history_list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff); history_layout.addWidget(self.history_list_view)
         clear_button = QPushButton("Clear History"); clear_button.clicked.connect(self.clear_history); history_layout.addWidget(clear_button)
         self.populate_history_list()
-    def populate_history_list(self):
-        self.history_list_widget.clear()
-        for entry in translation_history:
-            item_widget = HistoryItemWidget(entry['source'], entry['target']); list_item = QListWidgetItem(self.history_list_widget)
-            list_item.setSizeHint(item_widget.sizeHint()); self.history_list_widget.addItem(list_item); self.history_list_widget.setItemWidget(list_item, item_widget)
-            list_item.setData(Qt.ItemDataRole.UserRole, entry['target'])
-    def history_item_clicked(self, item):
-        original_target_text = item.data(Qt.ItemDataRole.UserRole)
+    def populate_history_list(self): self.history_model.set_query(self.history_search_input.text().strip())
+    def history_item_clicked(self, index):
+        original_target_text = index.data(Qt.ItemDataRole.UserRole)
         if original_target_text:
             clipboard = QApplication.clipboard(); clipboard.setText(original_target_text)
             self.status_label.setText(f"Copied to clipboard!"); print(f"Copied from history: {original_target_text}")
     def clear_history(self):
-        global translation_history
         reply = QMessageBox.question(self, "Clear History", "Are you sure you want to delete all translation history?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes: translation_history = []; save_json(HISTORY_FILE, []); self.populate_history_list(); print("History cleared.")
+        if reply == QMessageBox.StandardButton.Yes: get_history_store().clear(); self.populate_history_list(); print("History cleared.")
+    def setup_stats_tab(self, tab):
+        stats_layout = QVBoxLayout(tab); self.stats_table = QTableWidget(0, 6); self.stats_table.setHorizontalHeaderLabels(["Stage", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms"])
+        self.stats_table.verticalHeader().setVisible(False); self.stats_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        stats_layout.addWidget(self.stats_table); self.cache_stats_label = QLabel(""); self.cache_stats_label.setWordWrap(True); stats_layout.addWidget(self.cache_stats_label)
+        button_layout = QHBoxLayout(); reset_button = QPushButton("Reset"); reset_button.clicked.connect(self.reset_stats); export_button = QPushButton("Export..."); export_button.clicked.connect(self.export_stats)
+        button_layout.addWidget(reset_button); button_layout.addWidget(export_button); stats_layout.addLayout(button_layout)
+        self.stats_timer = QTimer(self); self.stats_timer.setInterval(1000); self.stats_timer.timeout.connect(self.refresh_stats); self.stats_timer.start(); self.refresh_stats()
+    def refresh_stats(self):
+        if not self.stats_table.isVisible() and self.stats_table.rowCount(): return
+        rows = latency_stats.summary(); self.stats_table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            values = [row['stage'], str(row['count'])] + [f"{row[key]:.1f}" for key in ('p50', 'p95', 'p99', 'max')]
+            for column, value in enumerate(values): self.stats_table.setItem(row_index, column, QTableWidgetItem(value))
+        translation_stats = get_translation_cache().stats(); ocr_stats = ocr_cache.stats()
+        self.cache_stats_label.setText(f"Translation cache: {translation_stats['hits']} hits ({translation_stats['disk_hits']} from disk), {translation_stats['misses']} misses. OCR cache: {ocr_stats['saved_calls']} OCR calls saved, {ocr_stats['misses']} misses.")
+    def reset_stats(self): latency_stats.reset(); self.refresh_stats()
+    def export_stats(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Latency Stats", "latency_stats.json", "JSON (*.json);;CSV (*.csv)")
+        if not file_path: return
+        try: latency_stats.export(file_path, {'translation_cache': get_translation_cache().stats(), 'ocr_cache': ocr_cache.stats()}); self.status_label.setText(f"Stats exported to {os.path.basename(file_path)}")
+        except OSError as e: QMessageBox.warning(self, "Export Failed", f"Could not export stats: {e}")
     def open_settings_window(self):
         if self.settings_window is None or not self.settings_window.isVisible(): self.settings_window = SettingsWindow(self.icon_path); self.settings_window.show()
     def save_settings_handler(self):
@@ -141,23 +594,24 @@ class MainWindow(QWidget):
         try:
             selected_source_lang = self.source_lang_combo.currentText(); app_config['source_lang'] = SUPPORTED_LANGUAGES[selected_source_lang]['deepl']
             selected_target_lang = self.target_lang_combo.currentText(); app_config['target_lang'] = {k: v for k, v in SUPPORTED_LANGUAGES.items() if k != "Auto-Detect"}[selected_target_lang]['deepl']
-            save_json(CONFIG_FILE, app_config); self.status_label.setText("Language settings saved!"); print("Settings saved:", app_config)
+            app_config['watch_mode'] = self.watch_mode_checkbox.isChecked()
+            save_json(CONFIG_FILE, app_config); warm_up_ocr_engine(app_config['source_lang']); self.status_label.setText("Settings saved!"); print("Settings saved:", app_config)
         except Exception: self.status_label.setText("Error: Could not save settings.")
 
-class Communicator(QObject): f8_pressed = pyqtSignal(); esc_pressed = pyqtSignal(); history_updated = pyqtSignal()
+class Communicator(QObject): f8_pressed = pyqtSignal(); esc_pressed = pyqtSignal(); history_updated = pyqtSignal(dict)
 
 class TranslationOverlay(QWidget):
     TOP_LEFT, TOP, TOP_RIGHT, LEFT, MOVE, RIGHT, BOTTOM_LEFT, BOTTOM, BOTTOM_RIGHT, NONE = range(10)
-    def __init__(self, text):
+    def __init__(self, text, pending=False):
         super().__init__()
-        self.translated_text = text; self.is_moving = False; self.is_resizing = False
+        self.translated_text = text; self.is_moving = False; self.is_resizing = False; self.blocks = []
         self.resize_margin = 5; self.resize_region = self.NONE
         self.start_pos = QPoint(); self.start_geom = QRect()
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground); self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating)
         self.setMouseTracking(True)
-        self.setup_ui(text)
-    def setup_ui(self, text):
+        self.setup_ui(text, pending)
+    def setup_ui(self, text, pending=False):
         container_layout = QVBoxLayout(self); container_layout.setContentsMargins(15, 15, 15, 15)
         self.scroll_area = QScrollArea(self); self.scroll_area.setWidgetResizable(True)
         self.scroll_area.setStyleSheet("QScrollArea { background: transparent; border: none; } QScrollBar:vertical {border: none; background: #3c3c3c; width: 10px; margin: 0px;} QScrollBar::handle:vertical {background: #808080; min-height: 20px; border-radius: 5px;}")
@@ -167,7 +621,14 @@ class TranslationOverlay(QWidget):
         self.copy_button = QPushButton("Copy Text")
         self.copy_button.setStyleSheet("QPushButton { background-color: #555; color: white; border: none; padding: 8px; border-radius: 5px; } QPushButton:hover { background-color: #666; } QPushButton:pressed { background-color: #777; }")
         self.copy_button.setCursor(Qt.CursorShape.PointingHandCursor); self.copy_button.clicked.connect(self.copy_to_clipboard)
-        container_layout.addWidget(self.copy_button)
+        container_layout.addWidget(self.copy_button); self.copy_button.setEnabled(not pending)
+    def set_text(self, text, pending=False):
+        self.translated_text = text; self.text_label.setText(text); self.copy_button.setEnabled(not pending); self.blocks = []
+    def set_block(self, index, count, text):
+        # Blocks arrive out of order; keep reading order and show a placeholder for the ones still in flight
+        if len(self.blocks) != count: self.blocks = [None] * count
+        self.blocks[index] = text; blocks = self.blocks
+        self.set_text('\n\n'.join(block if block is not None else '…' for block in blocks if block != ''), pending=True); self.blocks = blocks
     def copy_to_clipboard(self):
         clipboard = QApplication.clipboard(); clipboard.setText(self.translated_text); print("Text copied to clipboard.")
         self.copy_button.setText("Copied!"); QTimer.singleShot(2000, lambda: self.copy_button.setText("Copy Text"))
@@ -226,66 +687,548 @@ class SnippingWidget(QWidget):
         painter = QPainter(self); painter.fillRect(self.rect(), QColor(0, 0, 0, 70)); rect = QRect(self.begin, self.end); pen = QPen(Qt.GlobalColor.white, 2, Qt.PenStyle.SolidLine); painter.setPen(pen); painter.drawRect(rect.normalized())
     def mousePressEvent(self, event): self.begin = event.pos(); self.end = event.pos(); self.update()
     def mouseMoveEvent(self, event): self.end = event.pos(); self.update()
-    def mouseReleaseEvent(self, event): self.close(); capture_and_translate(QRect(self.begin, self.end).normalized())
+    def mouseReleaseEvent(self, event):
+        self.close(); rect = QRect(self.begin, self.end).normalized()
+        if app_config.get('watch_mode', DEFAULT_CONFIG['watch_mode']): start_watching(rect)
+        else: capture_and_translate(rect)
 
 snipping_widget = None; translation_overlay = None; main_window = None; communicator = None
+job_pool = None; current_job = None; active_jobs = {}; next_job_id = 0; region_watcher = None
+
+def get_ocr_lang_code(source_lang_deepl_code):
+    for lang_name, codes in SUPPORTED_LANGUAGES.items():
+        if codes['deepl'] == source_lang_deepl_code: return codes['tess']
+    return 'eng'
+
+def qimage_to_gray_array(qimage):
+    if qimage.format() not in (QImage.Format.Format_RGB32, QImage.Format.Format_ARGB32, QImage.Format.Format_ARGB32_Premultiplied): qimage = qimage.convertToFormat(QImage.Format.Format_RGB32)
+    # View the QImage buffer in place (BGRA byte order, rows padded to bytesPerLine); only the 8-bit result is allocated
+    pointer = qimage.constBits(); pointer.setsize(qimage.sizeInBytes()); height, width = qimage.height(), qimage.width()
+    pixels = np.frombuffer(pointer, dtype=np.uint8).reshape(height, qimage.bytesPerLine())[:, :width * 4].reshape(height, width, 4)
+    return ((pixels[..., 2].astype(np.uint16) * 77 + pixels[..., 1].astype(np.uint16) * 150 + pixels[..., 0].astype(np.uint16) * 29) >> 8).astype(np.uint8)
+
+def adaptive_threshold(gray, window, offset):
+    # Light-on-dark text (games, dark themes) is inverted so Tesseract always gets dark ink on white
+    if np.median(gray[::4, ::4]) < 128: gray = 255 - gray
+    window = max(3, window | 1); pad = window // 2; height, width = gray.shape; area = window * window
+    # uint32 holds the whole integral of a 4K frame (255 * 2191 * 3871 < 2**32) and wraps consistently for the box sums
+    integral = np.pad(gray, ((pad + 1, pad), (pad + 1, pad)), mode='edge').astype(np.uint32)
+    np.cumsum(integral, axis=0, out=integral); np.cumsum(integral, axis=1, out=integral)
+    local_sums = integral[window:window + height, window:window + width].copy(); local_sums -= integral[:height, window:window + width]
+    local_sums -= integral[window:window + height, :width]; local_sums += integral[:height, :width]; del integral
+    # gray < local_mean - offset, kept in integers: (gray + offset) * area < local_sum
+    scaled = gray.astype(np.uint32); scaled += max(offset, 0); scaled *= area
+    return np.where(scaled < local_sums, np.uint8(0), np.uint8(255))
+
+def crop_to_text(image, binarized):
+    if binarized: ink = image == 0
+    else: ink = np.abs(image.astype(np.int16) - int(np.median(image[::4, ::4]))) > 48
+    rows = np.flatnonzero(ink.any(axis=1)); cols = np.flatnonzero(ink.any(axis=0))
+    if not len(rows) or not len(cols): return image
+    margin = PREPROCESS_CROP_MARGIN
+    return image[max(rows[0] - margin, 0):rows[-1] + margin + 1, max(cols[0] - margin, 0):cols[-1] + margin + 1]
+
+def preprocess_for_ocr(gray, capture_dpi, options):
+    # Upscale the grayscale frame before thresholding: binarizing at screen resolution drops the thin strokes of small
+    # UI fonts, and resampling a 0/255 mask would hand Tesseract grayscale edges to binarize again
+    timings = {}; image = gray; binarized = False; scale = 1.0
+    def option(key): return options.get(key, DEFAULT_CONFIG[key])
+    if option('preprocess_upscale'):
+        stage_start = time.perf_counter(); height, width = image.shape
+        scale = min(max(option('preprocess_target_dpi') / capture_dpi, 1.0), 4.0)
+        scale = min(scale, (PREPROCESS_MAX_PIXELS / max(width * height, 1)) ** 0.5)
+        if scale > 1.05: image = np.asarray(Image.fromarray(np.ascontiguousarray(image)).resize((int(width * scale), int(height * scale)), Image.Resampling.BICUBIC))
+        else: scale = 1.0
+        timings['upscale'] = (time.perf_counter() - stage_start) * 1000
+    if option('preprocess_threshold'):
+        # The window is in screen pixels, so it grows with the upscale to cover the same neighbourhood of each glyph
+        stage_start = time.perf_counter(); image = adaptive_threshold(image, int(option('preprocess_threshold_window') * scale), option('preprocess_threshold_offset')); binarized = True
+        timings['threshold'] = (time.perf_counter() - stage_start) * 1000
+    if option('preprocess_crop'):
+        stage_start = time.perf_counter(); image = crop_to_text(image, binarized); timings['crop'] = (time.perf_counter() - stage_start) * 1000
+    return Image.fromarray(np.ascontiguousarray(image)), timings
+
+def split_runs(indices, min_gap):
+    breaks = np.flatnonzero(np.diff(indices) > min_gap)
+    starts = np.concatenate(([0], breaks + 1)); ends = np.concatenate((breaks, [len(indices) - 1]))
+    return [(indices[start], indices[end] + 1) for start, end in zip(starts, ends)]
+
+def segment_text_blocks(binary):
+    # Recursive XY-cut on the ink mask: split on blank column bands wider than a word gap that run the full height
+    # of the region, then on blank row bands wider than the line spacing. Adjacent row bands that each split into
+    # columns at a shared gap are kept together, so a two-column page reads L0, L1, R0, R1 rather than L0, R0, L1, R1,
+    # while a title, footer or page number that does not split on its own stays a band of its own
+    ink = binary == 0; line_heights = [end - start for start, end in find_text_lines(binary)]
+    if not line_heights: return []
+    line_height = int(np.median(line_heights)); row_gap = max(int(line_height * 0.8), 4); col_gap = max(int(line_height * 1.5), 12)
+    def column_runs(top, bottom, left, right): return split_runs(np.flatnonzero(ink[top:bottom, left:right].any(axis=0)), col_gap)
+    blocks = []; stack = [(0, ink.shape[0], 0, ink.shape[1])]
+    while stack:
+        top, bottom, left, right = stack.pop(); region = ink[top:bottom, left:right]
+        rows = np.flatnonzero(region.any(axis=1))
+        if not len(rows): continue
+        col_runs = column_runs(top + rows[0], top + rows[-1] + 1, left, right)
+        if len(col_runs) > 1: stack.extend((top + rows[0], top + rows[-1] + 1, left + start, left + end) for start, end in reversed(col_runs)); continue
+        row_groups = []
+        for start, end in split_runs(rows, row_gap):
+            if (row_groups and len(column_runs(top + start, top + end, left, right)) > 1 and len(column_runs(top + row_groups[-1][0], top + row_groups[-1][1], left, right)) > 1
+                    and len(column_runs(top + row_groups[-1][0], top + end, left, right)) > 1): row_groups[-1] = (row_groups[-1][0], end)
+            else: row_groups.append((start, end))
+        if len(row_groups) > 1: stack.extend((top + start, top + end, left, right) for start, end in reversed(row_groups)); continue
+        blocks.append((top + rows[0], top + rows[-1] + 1, left + col_runs[0][0], left + col_runs[0][1]))
+    return blocks
+
+def normalize_ocr_text(raw_extracted_text):
+    text_no_hyphens = re.sub(r'-\s*\n\s*', '', raw_extracted_text)
+    text_with_preserved_breaks = text_no_hyphens.replace('\n\n', '[P_BREAK]'); text_single_line = text_with_preserved_breaks.replace('\n', ' ')
+    text_normalized_spaces = re.sub(' +', ' ', text_single_line); return text_normalized_spaces.replace('[P_BREAK]', '\n\n')
+
+class JobSignals(QObject): finished = pyqtSignal(int, str, str); failed = pyqtSignal(int, str, str); done = pyqtSignal(int); block_ready = pyqtSignal(int, int, int, str)
+
+block_pool = None; block_pool_lock = threading.Lock()
+
+def get_block_pool():
+    global block_pool
+    with block_pool_lock:
+        if block_pool is None: block_pool = ThreadPoolExecutor(max_workers=get_layout_worker_count(), thread_name_prefix='ocr-block')
+        return block_pool
+
+def ocr_and_translate_block(block_image, capture_dpi, ocr_lang_code, source_lang, target_lang, backend, is_cancelled):
+    if is_cancelled(): return '', ''
+    ocr_image, _ = preprocess_for_ocr(block_image, capture_dpi, app_config)
+    with latency_stats.span('block.ocr'): source_text = normalize_ocr_text(get_ocr_engine().recognize(ocr_image, ocr_lang_code))
+    if not source_text or is_cancelled(): return source_text, ''
+    with latency_stats.span('block.translate'): return source_text, translate_texts_cached([source_text], backend, source_lang, target_lang)[0]
+
+def run_layout_pipeline(gray, capture_dpi, ocr_lang_code, source_lang, target_lang, backend, trace, is_cancelled, on_block):
+    with latency_stats.span('segment', trace):
+        binary = adaptive_threshold(gray, app_config.get('preprocess_threshold_window', DEFAULT_CONFIG['preprocess_threshold_window']), app_config.get('preprocess_threshold_offset', DEFAULT_CONFIG['preprocess_threshold_offset']))
+        blocks = segment_text_blocks(binary)
+    if len(blocks) < 2: return None
+    margin = PREPROCESS_CROP_MARGIN; results = [None] * len(blocks)
+    with latency_stats.span('blocks', trace):
+        futures = {get_block_pool().submit(ocr_and_translate_block, gray[max(top - margin, 0):bottom + margin, max(left - margin, 0):right + margin], capture_dpi, ocr_lang_code, source_lang, target_lang, backend, is_cancelled): index
+                   for index, (top, bottom, left, right) in enumerate(blocks)}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]; results[index] = future.result()
+                if on_block: on_block(index, len(blocks), results[index][1])
+        finally:
+            for future in futures: future.cancel()
+    return [result for result in results if result[0]]
+
+def run_capture_pipeline(qimage, source_lang, target_lang, backend, trace, is_cancelled=lambda: False, on_block=None):
+    with latency_stats.span('convert', trace):
+        capture_dpi = SCREEN_BASE_DPI * qimage.devicePixelRatio(); gray = qimage_to_gray_array(qimage)
+    ocr_lang_code = get_ocr_lang_code(source_lang)
+    with latency_stats.span('ocr_cache', trace): image_hash, raw_extracted_text = ocr_cache.lookup(gray, ocr_lang_code, app_config.get('ocr_cache_max_distance', DEFAULT_CONFIG['ocr_cache_max_distance']), app_config.get('ocr_cache_max_changed_pixels', DEFAULT_CONFIG['ocr_cache_max_changed_pixels']))
+    if raw_extracted_text is None and app_config.get('layout_parallel_ocr', DEFAULT_CONFIG['layout_parallel_ocr']) and gray.size >= app_config.get('layout_min_pixels', DEFAULT_CONFIG['layout_min_pixels']):
+        # Large selections: OCR and translate each text block in parallel and stream them out as they finish
+        block_results = run_layout_pipeline(gray, capture_dpi, ocr_lang_code, source_lang, target_lang, backend, trace, is_cancelled, on_block)
+        if is_cancelled(): return None
+        if block_results is not None:
+            # Cached as a tuple of block texts so a repeat capture translates the same blocks instead of the whole page
+            block_texts = tuple(source_text for source_text, _ in block_results); ocr_cache.store(image_hash, gray, ocr_lang_code, block_texts)
+            return '\n\n'.join(block_texts), '\n\n'.join(translated_text for _, translated_text in block_results)
+    if isinstance(raw_extracted_text, tuple):
+        print(f"OCR cache hit: {ocr_cache.stats()}")
+        with latency_stats.span('translate', trace): translations = translate_texts_cached(list(raw_extracted_text), backend, source_lang, target_lang)
+        return None if is_cancelled() else ('\n\n'.join(raw_extracted_text), '\n\n'.join(translations))
+    if raw_extracted_text is None:
+        with latency_stats.span('preprocess', trace): ocr_image, timings = preprocess_for_ocr(gray, capture_dpi, app_config)
+        for stage, elapsed_ms in timings.items(): latency_stats.record(f'preprocess.{stage}', elapsed_ms, trace)
+        if is_cancelled(): return None
+        with latency_stats.span('ocr', trace): raw_extracted_text = get_ocr_engine().recognize(ocr_image, ocr_lang_code)
+        ocr_cache.store(image_hash, gray, ocr_lang_code, raw_extracted_text)
+    else: print(f"OCR cache hit: {ocr_cache.stats()}")
+    with latency_stats.span('normalize', trace): processed_text = normalize_ocr_text(raw_extracted_text)
+    if is_cancelled(): return None
+    if not processed_text: return '', ''
+    with latency_stats.span('translate', trace): translated_text = translate_texts_cached([processed_text], backend, source_lang, target_lang)[0]
+    return None if is_cancelled() else (processed_text, translated_text)
+
+class TranslationJob(QRunnable):
+    def __init__(self, job_id, qimage, api_key, source_lang, target_lang, trace=None, started=None):
+        super().__init__(); self.setAutoDelete(False)
+        self.job_id = job_id; self.qimage = qimage; self.api_key = api_key; self.source_lang = source_lang; self.target_lang = target_lang
+        self.trace = trace if trace is not None else {}; self.started = started or time.perf_counter()
+        self.cancelled = threading.Event(); self.signals = JobSignals()
+    def cancel(self): self.cancelled.set()
+    def emit_block(self, index, count, translated_text):
+        if not self.cancelled.is_set(): self.signals.block_ready.emit(self.job_id, index, count, translated_text)
+    def run(self):
+        try:
+            if self.cancelled.is_set(): return
+            qimage = self.qimage; self.qimage = None
+            result = run_capture_pipeline(qimage, self.source_lang, self.target_lang, get_translator(self.api_key), self.trace, self.cancelled.is_set, self.emit_block)
+            if result is not None: self.signals.finished.emit(self.job_id, *result)
+        except deepl.AuthorizationException: self.signals.failed.emit(self.job_id, 'auth', '')
+        except Exception as e: self.signals.failed.emit(self.job_id, 'error', str(e))
+        finally: self.signals.done.emit(self.job_id)
+
+def show_translation_overlay(text, pending=False):
+    global translation_overlay
+    if translation_overlay and translation_overlay.isVisible(): translation_overlay.close()
+    translation_overlay = TranslationOverlay(text, pending)
+    # Varsayılan bir başlangıç boyutu veriyoruz ve merkeze alıyoruz
+    initial_width = 800; initial_height = 500
+    translation_overlay.resize(initial_width, initial_height)
+    screen_geometry = QGuiApplication.primaryScreen().geometry()
+    x_pos = (screen_geometry.width() - initial_width) / 2
+    y_pos = (screen_geometry.height() - initial_height) / 2
+    translation_overlay.move(int(x_pos), int(y_pos)); translation_overlay.show()
+
+def cancel_current_job():
+    global current_job
+    if current_job is None: return
+    job = current_job; current_job = None; job.cancel()
+    # Jobs still waiting in the queue never start; running ones drop their result at the next stage boundary
+    if job_pool.tryTake(job): active_jobs.pop(job.job_id, None)
+    print(f"Translation job {job.job_id} canceled.")
 
 def capture_and_translate(rect):
-    global translation_overlay; api_key = app_config.get('api_key')
+    global current_job, next_job_id; api_key = app_config.get('api_key')
     if not api_key: QMessageBox.warning(main_window, "API Key Missing", "DeepL API Key is not set. Please enter your key in the settings panel."); return
-    try:
-        screenshot = QGuiApplication.primaryScreen().grabWindow(0, rect.x(), rect.y(), rect.width(), rect.height())
-        buffer = screenshot.toImage(); image_bits = buffer.bits(); image_bits.setsize(buffer.sizeInBytes()); image_bytes = image_bits.asstring()
-        image = Image.frombytes("RGBA", (buffer.width(), buffer.height()), image_bytes, "raw", "BGRA").convert("L")
-        source_lang_deepl_code = app_config.get('source_lang', 'Auto')
-        ocr_lang_code = 'eng'
-        for lang_name, codes in SUPPORTED_LANGUAGES.items():
-            if codes['deepl'] == source_lang_deepl_code: ocr_lang_code = codes['tess']; break
-        raw_extracted_text = pytesseract.image_to_string(image, lang=ocr_lang_code).strip()
-        text_no_hyphens = re.sub(r'-\s*\n\s*', '', raw_extracted_text)
-        text_with_preserved_breaks = text_no_hyphens.replace('\n\n', '[P_BREAK]'); text_single_line = text_with_preserved_breaks.replace('\n', ' ')
-        text_normalized_spaces = re.sub(' +', ' ', text_single_line); processed_text = text_normalized_spaces.replace('[P_BREAK]', '\n\n')
-        if not processed_text: return
-        translator = deepl.Translator(api_key)
-        target_lang = app_config.get('target_lang'); translate_kwargs = {'target_lang': target_lang}; 
-        if source_lang_deepl_code and source_lang_deepl_code != 'Auto': translate_kwargs['source_lang'] = source_lang_deepl_code
-        result = translator.translate_text(processed_text, **translate_kwargs); translated_text = result.text
-        add_to_history(processed_text, translated_text); print(f"Translation ({source_lang_deepl_code} -> {target_lang}): '{translated_text}'")
-        if translation_overlay and translation_overlay.isVisible(): translation_overlay.close()
-        
-        # Artık boyut bilgisi config'den gelmiyor
-        translation_overlay = TranslationOverlay(translated_text)
-        
-        # Varsayılan bir başlangıç boyutu veriyoruz ve merkeze alıyoruz
-        initial_width = 800; initial_height = 500
-        translation_overlay.resize(initial_width, initial_height)
-        screen_geometry = QGuiApplication.primaryScreen().geometry()
-        x_pos = (screen_geometry.width() - initial_width) / 2
-        y_pos = (screen_geometry.height() - initial_height) / 2
-        translation_overlay.move(int(x_pos), int(y_pos)); translation_overlay.show()
-    except deepl.AuthorizationException: QMessageBox.warning(main_window, "Invalid API Key", "The DeepL API Key is invalid or has expired. Please check your key in the API Key Settings.")
-    except Exception as e: QMessageBox.critical(main_window, "Unexpected Error", f"An unexpected error occurred: {e}")
-
-def start_snipping(): global snipping_widget; snipping_widget = SnippingWidget()
+    trace = {}; started = time.perf_counter()
+    with latency_stats.span('grab', trace): qimage = QGuiApplication.primaryScreen().grabWindow(0, rect.x(), rect.y(), rect.width(), rect.height()).toImage()
+    cancel_current_job(); show_translation_overlay(TRANSLATING_TEXT, pending=True)
+    next_job_id += 1
+    job = TranslationJob(next_job_id, qimage, api_key, app_config.get('source_lang', 'Auto'), app_config.get('target_lang'), trace, started)
+    job.signals.finished.connect(on_job_finished); job.signals.failed.connect(on_job_failed); job.signals.done.connect(on_job_done); job.signals.block_ready.connect(on_job_block_ready)
+    active_jobs[job.job_id] = job; current_job = job; job_pool.start(job)
+
+def on_job_finished(job_id, processed_text, translated_text):
+    global current_job
+    if current_job is None or current_job.job_id != job_id: return
+    job = current_job; current_job = None
+    if not processed_text:
+        if translation_overlay and translation_overlay.isVisible(): translation_overlay.set_text("No text found in the selected area.")
+        return
+    add_to_history(processed_text, translated_text, job.source_lang, job.target_lang); print(f"Translation ({job.source_lang} -> {job.target_lang}): '{translated_text}'")
+    with latency_stats.span('overlay', job.trace):
+        if translation_overlay and translation_overlay.isVisible(): translation_overlay.set_text(translated_text)
+        else: show_translation_overlay(translated_text)
+    latency_stats.record('total', (time.perf_counter() - job.started) * 1000, job.trace); print(f"Capture timings (ms): {format_trace(job.trace)}")
+
+def on_job_failed(job_id, kind, message):
+    global current_job
+    if current_job is None or current_job.job_id != job_id: return
+    current_job = None; show_job_error(kind, message)
+
+def show_job_error(kind, message):
+    if translation_overlay and translation_overlay.isVisible(): translation_overlay.close()
+    if kind == 'auth': QMessageBox.warning(main_window, "Invalid API Key", "The DeepL API Key is invalid or has expired. Please check your key in the API Key Settings.")
+    else: QMessageBox.critical(main_window, "Unexpected Error", f"An unexpected error occurred: {message}")
+
+def on_job_block_ready(job_id, index, count, translated_text):
+    if current_job is None or current_job.job_id != job_id: return
+    if 'first_block' not in current_job.trace: latency_stats.record('first_block', (time.perf_counter() - current_job.started) * 1000, current_job.trace)
+    if translation_overlay and translation_overlay.isVisible(): translation_overlay.set_block(index, count, translated_text)
+
+def on_job_done(job_id): active_jobs.pop(job_id, None)
+
+def tile_changes(previous, current, tile_size):
+    changed = np.abs(current.astype(np.int16) - previous) > WATCH_PIXEL_DELTA
+    tile_rows = -(-changed.shape[0] // tile_size); tile_cols = -(-changed.shape[1] // tile_size)
+    padded = np.zeros((tile_rows * tile_size, tile_cols * tile_size), dtype=bool); padded[:changed.shape[0], :changed.shape[1]] = changed
+    return padded.reshape(tile_rows, tile_size, tile_cols, tile_size).any(axis=(1, 3))
+
+def find_text_lines(binary):
+    has_ink = np.concatenate(([False], (binary == 0).any(axis=1), [False]))
+    edges = np.flatnonzero(has_ink[1:] != has_ink[:-1])
+    return list(zip(edges[::2], edges[1::2]))
+
+class RegionWatcher(QObject):
+    def __init__(self, rect, api_key, source_lang, target_lang):
+        super().__init__(); self.rect = rect; self.api_key = api_key; self.source_lang = source_lang; self.target_lang = target_lang
+        self.ocr_lang_code = get_ocr_lang_code(source_lang); self.tile_size = app_config.get('watch_tile_size', DEFAULT_CONFIG['watch_tile_size'])
+        self.min_interval = max(int(1000 / max(app_config.get('watch_fps', DEFAULT_CONFIG['watch_fps']), 0.1)), 16)
+        self.max_interval = max(app_config.get('watch_max_interval_ms', DEFAULT_CONFIG['watch_max_interval_ms']), self.min_interval); self.interval = self.min_interval
+        self.previous_frame = None; self.previous_lines = {}; self.line_cache = OrderedDict(); self.segment_translations = OrderedDict()
+        self.pending_segments = OrderedDict(); self.recorded_segments = OrderedDict(); self.finished_segments = []; self.history_lock = threading.Lock()
+        self.source_text = ''; self.job = None; self.next_job_id = 0; self.stopped = False
+        self.timer = QTimer(self); self.timer.setSingleShot(True); self.timer.timeout.connect(self.poll)
+    def start(self): self.timer.start(0)
+    def stop(self):
+        self.stopped = True; self.timer.stop()
+        if self.job is not None: self.job.cancel()
+        with self.history_lock: self.finished_segments.extend(self.pending_segments); self.pending_segments.clear()
+        self.record_finished_segments()
+    def poll(self):
+        if self.stopped: return
+        if self.job is not None: self.timer.start(self.interval); return
+        with latency_stats.span('watch.grab'): qimage = QGuiApplication.primaryScreen().grabWindow(0, self.rect.x(), self.rect.y(), self.rect.width(), self.rect.height()).toImage()
+        frame = qimage_to_gray_array(qimage); changed_tiles = None
+        if self.previous_frame is not None and self.previous_frame.shape == frame.shape:
+            changed_tiles = tile_changes(self.previous_frame, frame, self.tile_size)
+            if not changed_tiles.any(): self.interval = min(self.interval * 2, self.max_interval); self.timer.start(self.interval); return
+        self.interval = self.min_interval; self.previous_frame = frame; self.next_job_id += 1
+        self.job = WatchJob(self.next_job_id, self, frame, changed_tiles, SCREEN_BASE_DPI * qimage.devicePixelRatio())
+        self.job.signals.finished.connect(self.on_frame_processed); self.job.signals.failed.connect(self.on_frame_failed); job_pool.start(self.job)
+    def process_frame(self, frame, changed_tiles, capture_dpi):
+        binary = adaptive_threshold(frame, app_config.get('preprocess_threshold_window', DEFAULT_CONFIG['preprocess_threshold_window']), app_config.get('preprocess_threshold_offset', DEFAULT_CONFIG['preprocess_threshold_offset']))
+        changed_rows = None if changed_tiles is None else np.flatnonzero(changed_tiles.any(axis=1))
+        current_lines = {}; paragraphs = []; lines = []; previous_end = None
+        for line_start, line_end in find_text_lines(binary):
+            touched = changed_rows is None or bool(np.any((changed_rows >= line_start // self.tile_size) & (changed_rows <= (line_end - 1) // self.tile_size)))
+            if not touched and (line_start, line_end) in self.previous_lines: text = self.previous_lines[(line_start, line_end)]
+            else:
+                band_rows = slice(max(line_start - 2, 0), line_end + 2); band = frame[band_rows]
+                band_key = (band.shape, hashlib.sha1(band.tobytes()).digest())
+                text = self.line_cache.get(band_key)
+                if text is None:
+                    ocr_image, _ = preprocess_for_ocr(band, capture_dpi, app_config); text = get_ocr_engine().recognize(ocr_image, self.ocr_lang_code)
+                    self.line_cache[band_key] = text
+                    while len(self.line_cache) > WATCH_LINE_CACHE_ENTRIES: self.line_cache.popitem(last=False)
+            current_lines[(line_start, line_end)] = text
+            # A vertical gap taller than the line itself starts a new paragraph
+            if lines and previous_end is not None and line_start - previous_end > line_end - line_start: paragraphs.append(lines); lines = []
+            if text: lines.append(text)
+            previous_end = line_end
+        if lines: paragraphs.append(lines)
+        self.previous_lines = current_lines
+        source_text = '\n\n'.join(normalize_ocr_text('\n'.join(lines)) for lines in paragraphs)
+        if source_text == self.source_text: return None
+        frame_segments = []; paragraph_translations = []
+        for lines in paragraphs:
+            segments = self.split_segments(lines)
+            for segment in segments:
+                if segment not in self.segment_translations:
+                    if self.stopped: return None
+                    self.segment_translations[segment] = translate_text_cached(normalize_ocr_text('\n'.join(segment)), self.api_key, self.source_lang, self.target_lang)
+                self.segment_translations.move_to_end(segment)
+            frame_segments.extend(segments); paragraph_translations.append(' '.join(self.segment_translations[segment] for segment in segments))
+        while len(self.segment_translations) > WATCH_LINE_CACHE_ENTRIES: self.segment_translations.popitem(last=False)
+        self.update_pending_segments(frame_segments); self.source_text = source_text
+        return source_text, '\n\n'.join(paragraph_translations)
+    def split_segments(self, lines):
+        # Splits a paragraph into runs of lines that were already translated together and runs of new lines, so a
+        # chat log or subtitle box that grows by one message only sends that message for translation
+        segments_by_first_line = {}
+        for segment in self.segment_translations: segments_by_first_line.setdefault(segment[0], []).append(segment)
+        segments = []; new_lines = []; index = 0
+        while index < len(lines):
+            matches = [segment for segment in segments_by_first_line.get(lines[index], ()) if tuple(lines[index:index + len(segment)]) == segment]
+            if not matches: new_lines.append(lines[index]); index += 1; continue
+            if new_lines: segments.append(tuple(new_lines)); new_lines = []
+            match = max(matches, key=len); segments.append(match); index += len(match)
+        if new_lines: segments.append(tuple(new_lines))
+        return segments
+    def update_pending_segments(self, frame_segments):
+        # A segment is finished once something follows it or it leaves the region; the last one may still grow
+        last_segment = frame_segments[-1] if frame_segments else None
+        with self.history_lock:
+            for segment in frame_segments:
+                if segment not in self.recorded_segments: self.pending_segments[segment] = None
+            for segment in [segment for segment in self.pending_segments if segment != last_segment]:
+                del self.pending_segments[segment]; self.finished_segments.append(segment)
+    def record_finished_segments(self):
+        with self.history_lock: finished_segments = self.finished_segments; self.finished_segments = []
+        for segment in finished_segments:
+            if segment in self.recorded_segments or segment not in self.segment_translations: continue
+            self.recorded_segments[segment] = None
+            while len(self.recorded_segments) > WATCH_LINE_CACHE_ENTRIES: self.recorded_segments.popitem(last=False)
+            add_to_history(normalize_ocr_text('\n'.join(segment)), self.segment_translations[segment], self.source_lang, self.target_lang)
+    def on_frame_processed(self, job_id, source_text, translated_text):
+        self.job = None
+        if self.stopped: return
+        self.record_finished_segments()
+        if source_text and translation_overlay and translation_overlay.isVisible(): translation_overlay.set_text(translated_text)
+        self.timer.start(self.interval)
+    def on_frame_failed(self, job_id, kind, message):
+        self.job = None
+        if self.stopped: return
+        stop_watching(); show_job_error(kind, message)
+
+class WatchJob(QRunnable):
+    def __init__(self, job_id, watcher, frame, changed_tiles, capture_dpi):
+        super().__init__(); self.setAutoDelete(False)
+        self.job_id = job_id; self.watcher = watcher; self.frame = frame; self.changed_tiles = changed_tiles; self.capture_dpi = capture_dpi
+        self.cancelled = threading.Event(); self.signals = JobSignals()
+    def cancel(self): self.cancelled.set()
+    def run(self):
+        try:
+            with latency_stats.span('watch.frame'): result = self.watcher.process_frame(self.frame, self.changed_tiles, self.capture_dpi)
+            if self.cancelled.is_set(): return
+            source_text, translated_text = result if result else ('', '')
+            self.signals.finished.emit(self.job_id, source_text, translated_text)
+        except deepl.AuthorizationException: self.signals.failed.emit(self.job_id, 'auth', '')
+        except Exception as e: self.signals.failed.emit(self.job_id, 'error', str(e))
+
+def exclude_from_capture(widget):
+    # Keeps the overlay out of our own screen grabs when it sits on top of the watched region (Windows 10 2004+)
+    try: ctypes.windll.user32.SetWindowDisplayAffinity(int(widget.winId()), 0x11)
+    except Exception as e: print(f"Could not exclude overlay from capture: {e}")
+
+def start_watching(rect):
+    global region_watcher; api_key = app_config.get('api_key')
+    if not api_key: QMessageBox.warning(main_window, "API Key Missing", "DeepL API Key is not set. Please enter your key in the settings panel."); return
+    stop_watching(); cancel_current_job(); show_translation_overlay(WATCHING_TEXT, pending=True); exclude_from_capture(translation_overlay)
+    region_watcher = RegionWatcher(rect, api_key, app_config.get('source_lang', 'Auto'), app_config.get('target_lang')); region_watcher.start()
+    print(f"Watching region {rect.x()},{rect.y()} {rect.width()}x{rect.height()}.")
+
+def stop_watching():
+    global region_watcher
+    if region_watcher is None: return
+    region_watcher.stop(); region_watcher = None; print("Stopped watching region.")
+
+def start_snipping(): global snipping_widget; stop_watching(); snipping_widget = SnippingWidget()
 def close_overlays():
     global translation_overlay, snipping_widget
+    cancel_current_job(); stop_watching()
     if translation_overlay and translation_overlay.isVisible(): print("Translation overlay closed."); translation_overlay.close()
     if snipping_widget and snipping_widget.isVisible(): print("Selection screen closed."); snipping_widget.close()
 class HotkeyListener(threading.Thread):
     def __init__(self, comm): super().__init__(); self.communicator = comm; self.daemon = True
     def run(self):
+        from pynput import keyboard  # Imported here so headless subcommands work without an X display
         def on_press(key):
             if key == keyboard.Key.f8: self.communicator.f8_pressed.emit()
             elif key == keyboard.Key.esc: self.communicator.esc_pressed.emit()
         with keyboard.Listener(on_press=on_press) as listener: listener.join()
 def main():
-    global main_window, communicator
+    global main_window, communicator, job_pool
     myappid = 'mycompany.screentranslator.1.0'; ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
     app = QApplication(sys.argv)
     script_dir = os.path.dirname(os.path.realpath(__file__)); icon_path = resource_path("icon.ico")
-    communicator = Communicator();
+    communicator = Communicator(); job_pool = QThreadPool(); job_pool.setMaxThreadCount(MAX_CONCURRENT_JOBS)
     main_window = MainWindow(icon_path); main_window.show()
     communicator.f8_pressed.connect(start_snipping); communicator.esc_pressed.connect(close_overlays)
-    hotkey_thread = HotkeyListener(communicator); hotkey_thread.start()
+    hotkey_thread = HotkeyListener(communicator); hotkey_thread.start(); warm_up_ocr_engine(app_config.get('source_lang', 'Auto'))
     print("Control Panel opened. Program is running."); sys.exit(app.exec())
-if __name__ == '__main__': main()
\ No newline at end of file
+def list_batch_images(input_path, recursive):
+    if os.path.isfile(input_path): return [os.path.abspath(input_path)]
+    if recursive: paths = (os.path.join(root, name) for root, _, names in os.walk(input_path) for name in names)
+    else: paths = (os.path.join(input_path, name) for name in os.listdir(input_path))
+    return sorted(os.path.abspath(path) for path in paths if path.lower().endswith(BATCH_IMAGE_EXTENSIONS))
+
+def load_batch_progress(output_path):
+    # Keyed on the language pair too, so rerunning into the same file with another target language is not skipped
+    done_files = set()
+    if not os.path.exists(output_path): return done_files
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try: record = json.loads(line)
+            except ValueError: continue  # a line cut short by an interrupted run is simply redone
+            if 'error' not in record: done_files.add((record['file'], record.get('source_lang'), record.get('target_lang')))
+    return done_files
+
+def ocr_image_file(task):
+    # Runs in a worker process; each worker keeps its own resident OCR engine
+    file_path, ocr_lang_code = task
+    try:
+        with Image.open(file_path) as image: gray = np.asarray(image.convert('L'))
+        ocr_image, _ = preprocess_for_ocr(gray, SCREEN_BASE_DPI, app_config)
+        return file_path, normalize_ocr_text(get_ocr_engine().recognize(ocr_image, ocr_lang_code)), None
+    except Exception as e: return file_path, '', str(e)
+
+def write_batch_results(output_file, results, backend, source_lang, target_lang):
+    translations = translate_texts_cached([text for _, text, _ in results], backend, source_lang, target_lang)
+    for (file_path, text, error), translated_text in zip(results, translations):
+        record = {'file': file_path, 'source_text': text, 'translation': translated_text, 'source_lang': source_lang, 'target_lang': target_lang}
+        if error: record['error'] = error
+        output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+    output_file.flush()
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog='ss_translator.py batch', description="Translate a folder of screenshots without the GUI. Results are appended to a JSONL file; rerunning skips files already in it.")
+    parser.add_argument('input', help="Image file or folder of screenshots.")
+    parser.add_argument('-o', '--output', default='translations.jsonl', help="JSONL output file (default: %(default)s).")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Include images in subfolders.")
+    parser.add_argument('--source-lang', default=app_config.get('source_lang', 'Auto'), help="DeepL source language code or Auto (default: %(default)s).")
+    parser.add_argument('--target-lang', default=app_config.get('target_lang', DEFAULT_CONFIG['target_lang']), help="DeepL target language code (default: %(default)s).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="OCR worker processes (default: %(default)s).")
+    parser.add_argument('--backend', choices=sorted(TRANSLATOR_BACKENDS), default=app_config.get('translator_backend', DEFAULT_CONFIG['translator_backend']), help="Translator backend (default: %(default)s).")
+    parser.add_argument('--server-url', default=app_config.get('translator_server_url') or None, help="Translation server URL, e.g. a local fake server.")
+    parser.add_argument('--api-key', default=app_config.get('api_key', ''), help="Translator API key (default: the key from config.json).")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.input): parser.error(f"{args.input} does not exist.")
+    backend = create_translator_backend(args.backend, args.api_key, args.server_url)
+    done_files = load_batch_progress(args.output); all_paths = list_batch_images(args.input, args.recursive)
+    image_paths = [path for path in all_paths if (path, args.source_lang, args.target_lang) not in done_files]
+    print(f"{len(image_paths)} images to translate, {len(all_paths) - len(image_paths)} already done.", file=sys.stderr)
+    if not image_paths: return 0
+    ocr_lang_code = get_ocr_lang_code(args.source_lang); completed = 0; pending_results = []; pending_bytes = 0
+    with open(args.output, 'a', encoding='utf-8') as output_file, ProcessPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        try:
+            for result in pool.map(ocr_image_file, [(path, ocr_lang_code) for path in image_paths], chunksize=4):
+                completed += 1; pending_results.append(result); pending_bytes += len(result[1].encode('utf-8'))
+                if result[2]: print(f"[{completed}/{len(image_paths)}] {result[0]}: {result[2]}", file=sys.stderr)
+                if len(pending_results) >= DEEPL_MAX_TEXTS_PER_REQUEST or pending_bytes >= DEEPL_MAX_REQUEST_BYTES:
+                    write_batch_results(output_file, pending_results, backend, args.source_lang, args.target_lang); pending_results = []; pending_bytes = 0
+                    print(f"[{completed}/{len(image_paths)}] translated", file=sys.stderr)
+            if pending_results: write_batch_results(output_file, pending_results, backend, args.source_lang, args.target_lang)
+        except BaseException:
+            # map() queued the whole folder; drop what has not started so a translator error or Ctrl-C stops the run
+            # now instead of after OCRing every remaining image. Written results stay in the file for the next run.
+            pool.shutdown(cancel_futures=True); backend.close(); raise
+    print(f"[{completed}/{len(image_paths)}] done, results in {args.output}. {get_translation_cache().stats()}", file=sys.stderr)
+    backend.close(); return 0
+
+BENCH_SAMPLE_TEXT = "The quick brown fox jumps over the lazy dog. Pack my box with five dozen liquor jugs."
+
+def pil_to_qimage(image):
+    rgba = image.convert('RGBA')
+    return QImage(rgba.tobytes('raw', 'BGRA'), rgba.width, rgba.height, rgba.width * 4, QImage.Format.Format_ARGB32).copy()
+
+def load_bench_corpus(corpus_path):
+    samples = []
+    for file_path in list_batch_images(corpus_path, recursive=True):
+        text_path = os.path.splitext(file_path)[0] + '.txt'; expected_text = BENCH_SAMPLE_TEXT
+        if os.path.exists(text_path):
+            with open(text_path, 'r', encoding='utf-8') as f: expected_text = f.read()
+        with Image.open(file_path) as image: samples.append((os.path.basename(file_path), pil_to_qimage(image), expected_text))
+    return samples
+
+def synthetic_bench_corpus():
+    from PIL import ImageDraw
+    samples = []
+    # Dialog line, paragraph and full-screen sizes, dark-on-light and light-on-dark
+    for index, (width, height, lines) in enumerate([(420, 60, 1), (900, 360, 8), (1920, 1080, 30)]):
+        for background, foreground in (('white', 'black'), ((30, 30, 30), (230, 230, 230))):
+            image = Image.new('RGB', (width, height), background); draw = ImageDraw.Draw(image)
+            for line in range(lines): draw.text((20, 15 + line * 30), BENCH_SAMPLE_TEXT, fill=foreground)
+            samples.append((f"synthetic_{width}x{height}_{'light' if background == 'white' else 'dark'}", pil_to_qimage(image), '\n'.join([BENCH_SAMPLE_TEXT] * lines)))
+    return samples
+
+def bench_main(argv):
+    global ocr_engine, translation_cache, ocr_cache
+    parser = argparse.ArgumentParser(prog='ss_translator.py bench', description="Replay sample images through the capture pipeline with stubbed OCR and translation. Needs no network or display.")
+    parser.add_argument('corpus', nargs='?', help="Folder of sample images; an optional <name>.txt next to each image is returned by the stub OCR, numbered per text block. Defaults to generated images.")
+    parser.add_argument('-n', '--iterations', type=int, default=10, help="Passes over the corpus (default: %(default)s).")
+    parser.add_argument('--ocr-delay-ms', type=float, default=0, help="Simulated OCR time per image.")
+    parser.add_argument('--translate-delay-ms', type=float, default=0, help="Simulated translation round-trip.")
+    parser.add_argument('--cache', action='store_true', help="Keep OCR and translation caches warm between passes.")
+    parser.add_argument('-o', '--output', help="Write the stats to a .json or .csv file.")
+    parser.add_argument('--baseline', help="Stats JSON from an earlier run; exit with status 1 if any stage's p50 got slower.")
+    parser.add_argument('--max-regression', type=float, default=0.25, help="Allowed p50 slowdown against the baseline (default: %(default)s).")
+    args = parser.parse_args(argv)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen'); app = QApplication.instance() or QApplication(sys.argv[:1])
+    samples = load_bench_corpus(args.corpus) if args.corpus else synthetic_bench_corpus()
+    if not samples: parser.error(f"No images found in {args.corpus}.")
+    ocr_engine = StubOcrEngine(args.ocr_delay_ms, unique_texts=True); translation_cache = TranslationCache(':memory:'); ocr_cache = OcrCache()
+    backend = EchoBackend(); backend.delay_ms = args.translate_delay_ms; latency_stats.reset()
+    for iteration in range(args.iterations):
+        for name, qimage, expected_text in samples:
+            if not args.cache: translation_cache.clear(); ocr_cache.clear()
+            trace = {}; started = time.perf_counter(); ocr_engine.next_text = expected_text
+            processed_text, translated_text = run_capture_pipeline(qimage, 'Auto', DEFAULT_CONFIG['target_lang'], backend, trace)
+            with latency_stats.span('overlay', trace): overlay = TranslationOverlay(translated_text); overlay.resize(800, 500); overlay.deleteLater()
+            latency_stats.record('total', (time.perf_counter() - started) * 1000, trace)
+        app.processEvents()
+    rows = latency_stats.summary()
+    print(f"{len(samples)} images x {args.iterations} passes")
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in rows: print(f"{row['stage']:<22}{row['count']:>7}{row['p50']:>10.2f}{row['p95']:>10.2f}{row['p99']:>10.2f}{row['max']:>10.2f}")
+    if args.output: latency_stats.export(args.output, {'samples': len(samples), 'iterations': args.iterations}); print(f"Stats written to {args.output}")
+    if not args.baseline: return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f: baseline = {row['stage']: row for row in json.load(f)['stages']}
+    regressions = [(row['stage'], baseline[row['stage']]['p50'], row['p50']) for row in rows if row['stage'] in baseline and row['p50'] > baseline[row['stage']]['p50'] * (1 + args.max_regression) + 0.05]
+    for stage, before, after in regressions: print(f"REGRESSION {stage}: p50 {before:.2f} ms -> {after:.2f} ms")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch': sys.exit(batch_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench': sys.exit(bench_main(sys.argv[2:]))
+    main()
\ No newline at end of file
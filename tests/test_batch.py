@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ss_translator
+
+
+class SizeOcrEngine:
+    # Stands in for Tesseract: every screenshot in the test has its own width, so the size identifies it
+    name = 'size'
+    def __init__(self): self.calls = 0; self.delay_ms = 0
+    def warm_up(self, lang): pass
+    def recognize(self, image, lang):
+        self.calls += 1
+        if self.delay_ms: time.sleep(self.delay_ms / 1000)
+        return f"text {image.width}x{image.height}"
+    def close(self): pass
+
+
+@pytest.fixture
+def translation_server():
+    requests = []; status = {'fail_after': None}
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            if status['fail_after'] is not None and len(requests) >= status['fail_after']: self.send_error(500); return
+            requests.append(payload)
+            body = json.dumps({'translations': [f"{payload['target_lang']}: {text}" for text in payload['texts']]}).encode('utf-8')
+            self.send_response(200); self.send_header('Content-Type', 'application/json'); self.send_header('Content-Length', str(len(body))); self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args): pass
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True); thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/translate", requests, status
+    server.shutdown(); server.server_close()
+
+
+@pytest.fixture
+def screenshots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ss_translator, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(ss_translator, 'ocr_engine', SizeOcrEngine())
+    monkeypatch.setattr(ss_translator, 'translation_cache', ss_translator.TranslationCache(':memory:'))
+    monkeypatch.setattr(ss_translator, 'DEEPL_MAX_TEXTS_PER_REQUEST', 2)
+    folder = tmp_path / 'shots'; folder.mkdir()
+    for index in range(5):
+        image = Image.new('RGB', (200 + 40 * index, 60), 'white')
+        ImageDraw.Draw(image).rectangle((10, 20, 150 + 40 * index, 40), fill='black')
+        image.save(folder / f"shot{index}.png")
+    return folder
+
+
+def run_batch(folder, server_url, *extra_args):
+    return ss_translator.batch_main([str(folder), '-o', 'out.jsonl', '--backend', 'http', '--server-url', server_url, '--workers', '2', '--source-lang', 'EN', *extra_args])
+
+
+def read_records():
+    with open('out.jsonl', 'r', encoding='utf-8') as f: return [json.loads(line) for line in f]
+
+
+def test_batch_translates_in_capped_requests(screenshots, translation_server):
+    server_url, requests, _ = translation_server
+    assert run_batch(screenshots, server_url, '--target-lang', 'DE') == 0
+    records = read_records()
+    assert sorted(os.path.basename(record['file']) for record in records) == [f"shot{index}.png" for index in range(5)]
+    assert all(record['translation'] == f"DE: {record['source_text']}" for record in records)
+    assert len({record['source_text'] for record in records}) == 5
+    assert [len(request['texts']) for request in requests] == [2, 2, 1]
+    assert all(request['source_lang'] == 'EN' and request['target_lang'] == 'DE' for request in requests)
+
+
+def test_batch_resume_skips_done_files_per_language_pair(screenshots, translation_server):
+    server_url, requests, _ = translation_server
+    run_batch(screenshots, server_url, '--target-lang', 'DE'); first_requests = len(requests)
+    run_batch(screenshots, server_url, '--target-lang', 'DE')
+    assert len(requests) == first_requests and len(read_records()) == 5
+    run_batch(screenshots, server_url, '--target-lang', 'FR')
+    records = read_records()
+    assert len(records) == 10 and sum(record['target_lang'] == 'FR' for record in records) == 5
+    assert all(request['target_lang'] == 'FR' for request in requests[first_requests:])
+
+
+def test_batch_resume_retries_failed_files(screenshots, translation_server):
+    server_url, requests, _ = translation_server
+    (screenshots / 'broken.png').write_bytes(b'not a png')
+    run_batch(screenshots, server_url, '--target-lang', 'DE')
+    assert sum('error' in record for record in read_records()) == 1
+    (screenshots / 'broken.png').unlink()
+    Image.new('RGB', (520, 60), 'white').save(screenshots / 'broken.png')
+    run_batch(screenshots, server_url, '--target-lang', 'DE')
+    assert [os.path.basename(record['file']) for record in read_records()[6:]] == ['broken.png']
+
+
+def test_batch_stops_on_translator_error_and_resumes(screenshots, translation_server):
+    server_url, requests, status = translation_server
+    for index in range(5, 40): Image.new('RGB', (200 + 40 * index, 60), 'white').save(screenshots / f"shot{index}.png")
+    ss_translator.ocr_engine.delay_ms = 20; status['fail_after'] = 1
+    with pytest.raises(urllib.error.HTTPError): run_batch(screenshots, server_url, '--target-lang', 'DE')
+    assert ss_translator.ocr_engine.calls < 20 and len(read_records()) == 2
+    status['fail_after'] = None; ss_translator.ocr_engine.delay_ms = 0
+    assert run_batch(screenshots, server_url, '--target-lang', 'DE') == 0
+    assert sum(len(request['texts']) for request in requests[1:]) == 38
+    records = read_records(); assert len({record['file'] for record in records}) == len(records) == 40
+
+
+def test_chunk_texts_respects_count_and_byte_limits():
+    texts = ['a' * 10, 'b' * 10, 'c' * 10, 'ü' * 10]
+    assert list(ss_translator.chunk_texts(texts, max_texts=2, max_bytes=1000)) == [texts[:2], texts[2:]]
+    assert list(ss_translator.chunk_texts(texts, max_texts=10, max_bytes=25)) == [texts[:2], texts[2:3], texts[3:]]
+    assert list(ss_translator.chunk_texts(['x' * 100], max_texts=10, max_bytes=25)) == [['x' * 100]]
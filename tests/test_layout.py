@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ss_translator
+
+
+class LoggingBackend:
+    name = 'logging'
+    def __init__(self): self.requests = []
+    def translate_batch(self, texts, source_lang, target_lang): self.requests.append(list(texts)); return [f"[{target_lang}] {text}" for text in texts]
+    def close(self): pass
+
+
+def draw_lines(draw, top, left, right, count, line_height=12, spacing=18):
+    for index in range(count):
+        for x in range(left, right - 10, 14): draw.rectangle((x, top + index * spacing, x + 9, top + index * spacing + line_height - 1), fill='black')
+
+
+@pytest.fixture
+def layout_setup(monkeypatch):
+    engine = ss_translator.StubOcrEngine(); engine.next_text = 'blocktext'
+    monkeypatch.setattr(ss_translator, 'ocr_engine', engine)
+    monkeypatch.setattr(ss_translator, 'translation_cache', ss_translator.TranslationCache(':memory:'))
+    monkeypatch.setattr(ss_translator, 'ocr_cache', ss_translator.OcrCache())
+    monkeypatch.setitem(ss_translator.app_config, 'layout_parallel_ocr', True)
+    monkeypatch.setitem(ss_translator.app_config, 'layout_min_pixels', 100_000)
+    return engine
+
+
+def test_repeat_capture_translates_cached_blocks(layout_setup):
+    image = Image.new('RGB', (900, 400), 'white'); draw = ImageDraw.Draw(image)
+    for top in (20, 140, 260): draw_lines(draw, top, 20, 880, 3)
+    qimage = ss_translator.pil_to_qimage(image); backend = LoggingBackend()
+    first = ss_translator.run_capture_pipeline(qimage, 'EN', 'DE', backend, {})
+    second = ss_translator.run_capture_pipeline(qimage, 'EN', 'DE', backend, {})
+    assert first == ('blocktext\n\nblocktext\n\nblocktext', '[DE] blocktext\n\n[DE] blocktext\n\n[DE] blocktext')
+    assert second == first and backend.requests == [['blocktext']]
+    assert ss_translator.ocr_cache.stats()['saved_calls'] == 1
+
+
+def test_cached_blocks_are_not_joined_across_hyphens(layout_setup):
+    layout_setup.next_text = 'ends with a hyphen-'
+    image = Image.new('RGB', (900, 400), 'white'); draw = ImageDraw.Draw(image)
+    for top in (20, 140): draw_lines(draw, top, 20, 880, 3)
+    qimage = ss_translator.pil_to_qimage(image); backend = LoggingBackend()
+    first = ss_translator.run_capture_pipeline(qimage, 'EN', 'DE', backend, {})
+    assert ss_translator.run_capture_pipeline(qimage, 'EN', 'DE', backend, {}) == first
+    assert first[0] == 'ends with a hyphen-\n\nends with a hyphen-'
+
+
+def two_column_page(title=True, footer=None, paragraphs=3):
+    # Paragraph gaps line up across the columns, so a row-first XY-cut would interleave them
+    image = Image.new('L', (600, 500), 255); draw = ImageDraw.Draw(image)
+    if title: draw_lines(draw, 10, 20, 580, 1)
+    for left, right in ((20, 280), (320, 580)):
+        for index in range(paragraphs): draw_lines(draw, 60 + index * 66, left, right, 2)
+    if footer: draw_lines(draw, 460, *footer, 1)
+    return np.asarray(image)
+
+
+def block_origins(binary): return [(int(top), int(left)) for top, _, left, _ in ss_translator.segment_text_blocks(binary)]
+
+
+@pytest.mark.parametrize('title', [True, False])
+def test_two_column_page_reads_column_by_column(title):
+    expected = [(60, 20), (126, 20), (192, 20), (60, 320), (126, 320), (192, 320)]
+    assert block_origins(two_column_page(title)) == ([(10, 20)] if title else []) + expected
+
+
+@pytest.mark.parametrize('footer', [(20, 580), (20, 120), (400, 500)])
+def test_footer_stays_after_both_columns(footer):
+    assert block_origins(two_column_page(footer=footer)) == [(10, 20), (60, 20), (126, 20), (192, 20), (60, 320), (126, 320), (192, 320), (460, footer[0])]
+
+
+def test_single_column_paragraph_is_not_split_by_a_right_aligned_line():
+    image = Image.new('L', (600, 200), 255); draw = ImageDraw.Draw(image)
+    draw_lines(draw, 10, 450, 580, 1); draw_lines(draw, 60, 20, 580, 3)
+    assert block_origins(np.asarray(image)) == [(10, 450), (60, 20)]